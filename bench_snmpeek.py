@@ -0,0 +1,596 @@
+#!/usr/bin/env python3
+"""Benchmark SNMPeek's hot paths against synthetic data.
+
+Loads the SNMPeek script as a module, so no AKiPS server is needed; the
+end-to-end benchmark talks to the synthetic server in fake_akips.py.
+
+    ./bench_snmpeek.py                      # run everything
+    ./bench_snmpeek.py hostname-matcher     # run one benchmark
+    ./bench_snmpeek.py e2e --save base.json # record results...
+    ./bench_snmpeek.py e2e --compare base.json  # ...and check for regressions
+    ./bench_snmpeek.py startup              # interpreter + import time
+"""
+
+import argparse
+import csv
+import fnmatch
+import io
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from rich.console import Console
+
+from fake_akips import Inventory, fake_client, load_snmpeek
+
+# Timings recorded by report(), as {"benchmark: measurement": seconds}
+RESULTS = {}
+CURRENT = [""]
+
+
+def best_of(fn, repeat):
+    """Return (best wall time in seconds, last result) over `repeat` runs."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def report(name, seconds, baseline=None):
+    RESULTS[f"{CURRENT[0]}: {name}"] = seconds
+    line = f"  {name:<28} {seconds * 1000:10.1f} ms"
+    if baseline:
+        line += f"   ({baseline / seconds:.1f}x)"
+    print(line)
+
+
+# ---------------------------------------------------------------------------
+# Synthetic data
+# ---------------------------------------------------------------------------
+
+
+def synthetic_hostnames(count, seed=0):
+    """Device names shaped like a campus inventory: building, switch, role."""
+    rng = random.Random(seed)
+    roles = ["core", "dist", "edge", "ap", "ups", "pdu"]
+    return [
+        f"bldg{rng.randint(0, 999):03d}-sw{rng.randint(0, 99):02d}-"
+        f"{rng.choice(roles)}.net.example.edu"
+        for _ in range(count)
+    ]
+
+
+def synthetic_patterns(count, seed=1):
+    """Hostname queries as classify_query() produces them, mostly *literal*."""
+    rng = random.Random(seed)
+    patterns = []
+    for i in range(count):
+        if i % 20 == 19:
+            patterns.append(f"*sw{rng.randint(0, 99):02d}-?p*")
+        elif i % 10 == 9:
+            patterns.append(f"bldg{rng.randint(0, 999):03d}*")
+        else:
+            patterns.append(f"*bldg{rng.randint(0, 999):03d}-sw*")
+    return patterns
+
+
+# Bracket wildcards for the hostname-matcher equivalence check, including
+# the odd ones fnmatch accepts: reversed ranges, a literal ] or ^, unclosed [
+BRACKET_PATTERNS = [
+    "bldg00[0-4]*",
+    "*sw0[!1-3]-*",
+    "*-[ce]???.*",
+    "bldg[0-9][0-9]1-sw*",
+    "*[z-a]*",
+    "*[^a]*",
+    "[^]*",
+    "*[]]*",
+    "*[!]*",
+    "bldg[*",
+]
+
+
+def synthetic_enum_states(devices, seed=2):
+    """PING.icmpState and SNMP.snmpState enum strings, one of each per device.
+
+    As AKIPS sends them, the ping description is the device's IP and the
+    modified time is per device, so nearly every string is distinct.
+    """
+    rng = random.Random(seed)
+    base = 1733253513
+    values = []
+    for i in range(devices):
+        ip = f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}"
+        state = rng.choice(["1,down", "2,up"])
+        values.append(f"{state},{base},{base + rng.randint(0, 10**6)},{ip}")
+        values.append(f"{state},{base},{base + rng.randint(0, 10**6)},snmp")
+    return values
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+
+def bench_hostname_matcher(snmpeek, args):
+    """Per-device fnmatch loop vs compile_hostname_matcher()."""
+    names = synthetic_hostnames(args.devices)
+    patterns = synthetic_patterns(args.patterns)
+    print(f"hostname-matcher: {len(names)} devices x {len(patterns)} patterns")
+
+    def legacy():
+        matched = 0
+        for name in names:
+            for pattern in patterns:
+                if fnmatch.fnmatch(name.lower(), pattern.lower()):
+                    matched += 1
+                    break
+        return matched
+
+    def compiled():
+        match = snmpeek.compile_hostname_matcher(patterns)
+        return sum(1 for name in names if match(name))
+
+    legacy_time, legacy_count = best_of(legacy, 1)
+    compiled_time, compiled_count = best_of(compiled, args.repeat)
+    assert legacy_count == compiled_count, (legacy_count, compiled_count)
+
+    # Every bracket pattern must match exactly the names fnmatch does
+    for pattern in BRACKET_PATTERNS:
+        match = snmpeek.compile_hostname_matcher([pattern])
+        for name in names[:2000]:
+            expected = fnmatch.fnmatch(name.lower(), pattern.lower())
+            assert match(name) == expected, (pattern, name, expected)
+
+    report("fnmatch loop", legacy_time)
+    report("compiled matcher", compiled_time, legacy_time)
+
+
+def bench_enum_parse(snmpeek, args):
+    """Regex + datetime per value vs split-based parse_enum_state().
+
+    Fails if the new parser is not faster, guarding its throughput.
+    """
+    values = synthetic_enum_states(args.devices)
+    print(f"enum-parse: {len(values)} enum values")
+
+    def legacy():
+        parsed = []
+        for enum_data in values:
+            match = re.match(r"^(\S*),(\S*),(\S*),(\S*),(.*)$", enum_data)
+            modified = datetime.fromtimestamp(int(match.group(4)))
+            parsed.append((match.group(2), modified))
+        return parsed
+
+    def current():
+        return [snmpeek.parse_enum_state(enum_data) for enum_data in values]
+
+    legacy_time, legacy_parsed = best_of(legacy, args.repeat)
+    current_time, current_parsed = best_of(current, args.repeat)
+    assert [v for v, _ in legacy_parsed] == [v for v, _ in current_parsed]
+
+    report("regex + fromtimestamp", legacy_time)
+    report("parse_enum_state", current_time, legacy_time)
+    print(f"  {len(values) / current_time:,.0f} values/s")
+    if current_time >= legacy_time:
+        sys.exit("enum-parse: parse_enum_state is slower than the regex baseline")
+
+
+# api-spm output variants: (label, delimiter, header row or None)
+SPM_VARIANTS = [
+    ("tab, header", "\t", ["MAC", "Vendor", "Switch", "Interface", "VLAN", "IP"]),
+    ("tab", "\t", None),
+    (
+        "semicolon, header",
+        ";",
+        ["MAC Address", "Vendor", "Switch", "Port", "VLAN", "IP Address"],
+    ),
+    ("semicolon", ";", None),
+    ("comma, header", ",", ["mac", "manufacturer", "device", "ifName", "vlan", "ipaddr"]),
+    ("comma", ",", None),
+]
+
+
+def synthetic_spm_entries(count, seed=3):
+    """SPM entries as parse_spm_response() should return them.
+
+    Some vendors contain commas and some entries have no IP, so the comma
+    variant needs quoting and trailing empty fields are kept.
+    """
+    rng = random.Random(seed)
+    vendors = ["Cisco Systems, Inc", "Dell Inc.", "Hewlett Packard", "Apple, Inc."]
+    entries = []
+    for i in range(count):
+        entries.append({
+            "mac": ":".join(f"{b:02x}" for b in (2, 0, *i.to_bytes(4, "big"))),
+            "vendor": rng.choice(vendors),
+            "switch": f"bldg{i // 4800:03d}-sw{i // 48 % 100:02d}-edge",
+            "interface": f"Gi1/0/{i % 48 + 1}",
+            "vlan": str(100 + i % 8),
+            "ip": f"10.{200 + i // 65536}.{i // 256 % 256}.{i % 256}" if i % 5 else "",
+        })
+    return entries
+
+
+def spm_fixture(entries, delimiter, header):
+    """Render entries as an api-spm reply in one of the SPM_VARIANTS."""
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=delimiter, lineterminator="\n")
+    if header:
+        writer.writerow(header)
+    keys = ("mac", "vendor", "switch", "interface", "vlan", "ip")
+    for entry in entries:
+        writer.writerow([entry[key] for key in keys])
+    return out.getvalue()
+
+
+def legacy_parse_spm(text):
+    """parse_spm_response() before it moved to the csv module, for comparison."""
+    results = []
+    lines = text.strip().split("\n")
+    first_line = lines[0]
+    if "\t" in first_line:
+        delimiter = "\t"
+    elif ";" in first_line:
+        delimiter = ";"
+    else:
+        delimiter = ","
+    first_fields = [f.strip().lower() for f in first_line.split(delimiter)]
+    header_keywords = {"mac", "vendor", "switch", "interface", "vlan", "ip", "address"}
+    has_header = (
+        sum(1 for f in first_fields if any(kw in f for kw in header_keywords)) >= 2
+    )
+    if has_header:
+        headers = [f.strip().lower().replace(" ", "_") for f in first_line.split(delimiter)]
+        for line in lines[1:]:
+            if not line.strip():
+                continue
+            fields = [f.strip() for f in line.split(delimiter)]
+            entry = {}
+            for i, h in enumerate(headers):
+                if i < len(fields):
+                    key = h
+                    if "mac" in h:
+                        key = "mac"
+                    elif "vendor" in h or "manufacturer" in h:
+                        key = "vendor"
+                    elif "switch" in h or "device" in h:
+                        key = "switch"
+                    elif "interface" in h or "port" in h:
+                        key = "interface"
+                    elif "vlan" in h:
+                        key = "vlan"
+                    elif "ip" in h or "address" in h:
+                        key = "ip"
+                    entry[key] = fields[i]
+            results.append(entry)
+    else:
+        field_names = ["mac", "vendor", "switch", "interface", "vlan", "ip"]
+        for line in lines:
+            if not line.strip():
+                continue
+            fields = [f.strip() for f in line.split(delimiter)]
+            entry = {}
+            for i, name in enumerate(field_names):
+                if i < len(fields):
+                    entry[name] = fields[i]
+            results.append(entry)
+    return results
+
+
+def bench_spm_parse(snmpeek, args):
+    """parse_spm_response() on every SPM_VARIANTS fixture, for a bulk dump
+    and for many one-entry replies (as MAC lookups get them).
+
+    Fails if any variant parses wrongly, or if the tab/header bulk dump
+    parses more than --tolerance slower than the split-based parser it
+    replaced (the margin is small, so a strict comparison would flake).
+    """
+    entries = synthetic_spm_entries(args.spm_rows)
+    replies = entries[: args.macs]
+    print(f"spm-parse: {len(entries)}-row dumps, {len(replies)} one-entry replies")
+
+    for label, delimiter, header in SPM_VARIANTS:
+        text = spm_fixture(entries, delimiter, header)
+        texts = [spm_fixture([entry], delimiter, header) for entry in replies]
+        snmpeek.spm_header_keys.cache_clear()
+        bulk_time, parsed = best_of(
+            lambda: snmpeek.parse_spm_response(text), args.repeat
+        )
+        if parsed != entries:
+            sys.exit(f"spm-parse: {label} dump parsed incorrectly")
+        replies_time, _ = best_of(
+            lambda: [snmpeek.parse_spm_response(t) for t in texts], args.repeat
+        )
+        report(f"{label} dump", bulk_time)
+        report(f"{label} replies", replies_time)
+        print(f"    {len(entries) / bulk_time:,.0f} rows/s")
+
+    label, delimiter, header = SPM_VARIANTS[0]
+    text = spm_fixture(entries, delimiter, header)
+    legacy_time, _ = best_of(lambda: legacy_parse_spm(text), args.repeat)
+    current_time, _ = best_of(lambda: snmpeek.parse_spm_response(text), args.repeat)
+    report("split-based dump", legacy_time)
+    report("parse_spm_response dump", current_time, legacy_time)
+    if current_time > legacy_time * (1 + args.tolerance):
+        sys.exit(
+            f"spm-parse: parse_spm_response is more than {args.tolerance:.0%} "
+            "slower than the split baseline"
+        )
+
+
+# (label, SNMPeek arguments) host queries for the end-to-end benchmark: a
+# broad subnet fetched in full, and narrow ones resolved on the server
+E2E_HOST_QUERIES = [
+    ("hosts /16", ["10.0.0.0/16", "--groups", "--snmp", "--lldp"]),
+    ("hosts /24", ["10.0.5.0/24", "--groups", "--snmp", "--lldp"]),
+    ("hosts glob", ["bldg01*-sw1?-edge", "--descr", "--location"]),
+]
+
+
+def bench_e2e(snmpeek, args):
+    """fetch_data(), filter_and_merge(), rendering and CSV export per query,
+    and fetch_mac_data() for MAC lookups, against fake_akips.py.
+
+    Each query is run once to warm the fake server's reply cache, so timings
+    are SNMPeek's own plus the configured --latency/--bandwidth.  Rendering
+    is timed once per query rather than best of --repeat.
+    """
+    inventory = Inventory(args.devices)
+    api, adapter = fake_client(
+        inventory,
+        latency=args.latency / 1000,
+        bandwidth=args.bandwidth * 1e6 if args.bandwidth else None,
+    )
+    # Rendered output goes nowhere; rendering still does all of its work
+    snmpeek.console = Console(file=io.StringIO(), width=160)
+    print(
+        f"e2e: {args.devices} devices, {args.macs} MACs, "
+        f"{args.latency:g} ms latency"
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "out.csv")
+
+        for label, argv in E2E_HOST_QUERIES:
+            query_args = snmpeek.parse_args(argv + ["--no-cache"])
+            networks, patterns = [], []
+            for q in query_args.query:
+                qtype, value = snmpeek.classify_query(q)
+                (networks if qtype == "subnet" else patterns).append(value)
+            query_args.subnet_column = len(networks) > 1
+            query_args.server_column = False
+
+            def fetch():
+                return snmpeek.fetch_data(api, query_args, networks, patterns)
+
+            fetch()
+            before = adapter.requests, adapter.bytes
+            fetch_time, (devices, ping_states, extras) = best_of(fetch, args.repeat)
+            requests = (adapter.requests - before[0]) // args.repeat
+            size = (adapter.bytes - before[1]) / args.repeat
+
+            merge_time, rows = best_of(
+                lambda: snmpeek.filter_and_merge(
+                    networks, patterns, devices, ping_states, extras, query_args
+                ),
+                args.repeat,
+            )
+            # A Rich table of every row is slow enough to time once
+            render_time, _ = best_of(
+                lambda: snmpeek.display_results(rows, networks, patterns, query_args),
+                1,
+            )
+            csv_time, _ = best_of(
+                lambda: snmpeek.write_csv(rows, csv_path, query_args), args.repeat
+            )
+
+            report(f"{label} fetch_data", fetch_time)
+            report(f"{label} filter_and_merge", merge_time)
+            report(f"{label} display_results", render_time)
+            report(f"{label} write_csv", csv_time)
+            print(
+                f"    {len(rows)} rows, {requests} requests, "
+                f"{size / 1e6:.1f} MB per fetch"
+            )
+
+        macs = inventory.macs(args.macs)
+        mac_args = snmpeek.parse_args(macs[:1] + ["--workers", str(args.workers)])
+        snmpeek.fetch_mac_data({"fake": api}, macs, mac_args)
+        mac_time, mac_data = best_of(
+            lambda: snmpeek.fetch_mac_data({"fake": api}, macs, mac_args), args.repeat
+        )
+        render_time, _ = best_of(
+            lambda: snmpeek.display_mac_results(mac_data), args.repeat
+        )
+        csv_time, _ = best_of(
+            lambda: snmpeek.write_mac_csv(mac_data, csv_path), args.repeat
+        )
+        report("macs fetch_mac_data", mac_time)
+        report("macs display_mac_results", render_time)
+        report("macs write_mac_csv", csv_time)
+
+
+# (label, SNMPeek arguments) for the startup benchmark.  stdout is always a
+# pipe; queries stop at the credential check, so nothing is fetched.
+STARTUP_RUNS = [
+    ("--help", ["--help"]),
+    ("query, piped", ["10.0.0.0/24"]),
+    ("query, table", ["10.0.0.0/24", "--format", "table"]),
+]
+
+
+def import_times(stderr):
+    """Parse `python -X importtime` output into {top-level module: seconds}."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented under the module that pulled them in
+        if not name.startswith("  ", 1):
+            times[name.strip()] = int(cumulative) / 1e6
+    return times
+
+
+def bench_startup(snmpeek, args):
+    """Wall time and `python -X importtime` totals for short SNMPeek runs.
+
+    Tracks what a one-shot scripted lookup pays before doing any work:
+    interpreter startup plus module imports.  Credentials are blanked so
+    queries exit at the credential check instead of contacting a server.
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "SNMPeek")
+    env = dict(os.environ, AKIPS_SERVER="", AKIPS_PASSWORD="")
+    print("startup: python -X importtime, stdout piped")
+
+    def run(argv, importtime=False):
+        flags = ["-X", "importtime"] if importtime else []
+        return subprocess.run(
+            [sys.executable, *flags, script, *argv],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+
+    python_time, _ = best_of(
+        lambda: subprocess.run([sys.executable, "-c", "pass"], env=env),
+        args.repeat,
+    )
+    report("python -c pass", python_time)
+    for label, argv in STARTUP_RUNS:
+        wall_time, _ = best_of(lambda: run(argv), args.repeat)
+        modules = import_times(run(argv, importtime=True).stderr)
+        heaviest = sorted(modules.items(), key=lambda item: -item[1])[:3]
+        report(f"{label} wall", wall_time)
+        report(f"{label} imports", sum(modules.values()))
+        print(
+            "    heaviest: "
+            + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in heaviest)
+        )
+
+
+BENCHMARKS = {
+    "hostname-matcher": bench_hostname_matcher,
+    "enum-parse": bench_enum_parse,
+    "spm-parse": bench_spm_parse,
+    "e2e": bench_e2e,
+    "startup": bench_startup,
+}
+
+
+# Changes smaller than this are timer noise, whatever the percentage
+NOISE_FLOOR = 0.001
+
+
+def settings(args):
+    return {
+        "devices": args.devices,
+        "patterns": args.patterns,
+        "macs": args.macs,
+        "spm_rows": args.spm_rows,
+        "latency": args.latency,
+        "bandwidth": args.bandwidth,
+        "workers": args.workers,
+    }
+
+
+def save_results(path, args):
+    record = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": settings(args),
+        "results": RESULTS,
+    }
+    with open(path, "w") as f:
+        json.dump(record, f, indent=2)
+    print(f"Results saved to {path}")
+
+
+def compare_results(path, args):
+    """Print timings against a saved run; return True if any regressed."""
+    with open(path) as f:
+        saved = json.load(f)
+    baseline = saved["results"]
+    tolerance = args.tolerance
+    print(f"\nCompared with {path} (tolerance {tolerance:.0%}):")
+    if saved.get("settings") != settings(args):
+        print(f"  note: saved with different settings {saved.get('settings')}")
+    regressed = False
+    for name, seconds in RESULTS.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]
+        change = seconds / old - 1 if old else 0.0
+        flag = ""
+        if change > tolerance and seconds - old > NOISE_FLOOR:
+            flag = "  REGRESSION"
+            regressed = True
+        print(
+            f"  {name:<44} {old * 1000:9.1f} -> {seconds * 1000:9.1f} ms"
+            f"  {change:+7.1%}{flag}"
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        help=f"Benchmarks to run (default: all): {', '.join(BENCHMARKS)}",
+    )
+    parser.add_argument("--devices", type=int, default=40000)
+    parser.add_argument("--patterns", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--macs", type=int, default=500)
+    parser.add_argument("--spm-rows", type=int, default=100000)
+    parser.add_argument(
+        "--latency", type=float, default=0, help="Fake AKiPS latency per request, ms"
+    )
+    parser.add_argument(
+        "--bandwidth", type=float, default=None, help="Fake AKiPS bandwidth, MB/s"
+    )
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--save", metavar="FILE", help="Write timings as JSON")
+    parser.add_argument(
+        "--compare",
+        metavar="FILE",
+        help="Compare with timings saved by --save; exit 1 on a regression",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Slowdown allowed by --compare, and by spm-parse against its "
+        "baseline, before it fails (default: 0.25)",
+    )
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+
+    snmpeek = load_snmpeek()
+    for name in args.benchmarks or BENCHMARKS:
+        CURRENT[0] = name
+        BENCHMARKS[name](snmpeek, args)
+
+    if args.save:
+        save_results(args.save, args)
+    if args.compare and compare_results(args.compare, args):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""Offline stand-in for an AKiPS server, for benchmarking SNMPeek.
+
+FakeAkipsAdapter is a requests transport adapter that answers the api-db
+commands and api-spm lookups SNMPeek sends from a synthetic Inventory, with
+configurable per-request latency and bandwidth.  It is mounted on a real
+AKIPS client's session, so the akips library's own request and parsing code
+still runs; only the network is replaced.
+
+Run SNMPeek against it without a server (arguments after -- go to SNMPeek):
+
+    ./fake_akips.py --devices 20000 --latency 50 -- 10.0.1.0/24 --groups
+"""
+
+import argparse
+import importlib.machinery
+import importlib.util
+import os
+import re
+import sys
+import threading
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from akips import AKIPS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Device n of every building of 100 has role ROLES[n % len(ROLES)]
+ROLES = ("core", "dist", "edge", "edge", "edge", "ap")
+PORTS_PER_SWITCH = 48
+SYS_ATTRIBUTES = (
+    "ip4addr",
+    "SNMPv2-MIB.sysName",
+    "SNMPv2-MIB.sysDescr",
+    "SNMPv2-MIB.sysObjectID",
+    "SNMPv2-MIB.sysLocation",
+    "SNMPv2-MIB.sysContact",
+    "SNMP.snmpState",
+)
+PING_ATTRIBUTES = ("PING.icmpState",)
+LLDP_ATTRIBUTES = ("LLDP-MIB.lldpRemSysName", "LLDP-MIB.lldpRemPortId")
+PORT_ATTRIBUTES = (
+    "IF-MIB.ifOperStatus",
+    "IF-MIB.ifAdminStatus",
+    "IF-MIB.ifAlias",
+    "IF-MIB.ifHighSpeed",
+)
+SPM_HEADER = "MAC\tVendor\tSwitch\tInterface\tVLAN\tIP"
+
+
+def load_snmpeek():
+    """Import the extension-less SNMPeek script as a module."""
+    path = os.path.join(HERE, "SNMPeek")
+    loader = importlib.machinery.SourceFileLoader("snmpeek", path)
+    spec = importlib.util.spec_from_loader("snmpeek", loader)
+    module = importlib.util.module_from_spec(spec)
+    loader.exec_module(module)
+    return module
+
+
+def is_regex(token):
+    return len(token) > 1 and token.startswith("/") and token.endswith("/")
+
+
+def compile_filter(token):
+    """AKiPS parent/child/attribute/value token -> predicate, or None for '*'."""
+    if token == "*":
+        return None
+    if is_regex(token):
+        return re.compile(token[1:-1]).search
+    return token.__eq__
+
+
+def mixed(i):
+    """Cheap deterministic per-item hash, so synthetic data needs no storage."""
+    return (i * 2654435761) & 0xFFFFFFFF
+
+
+class Inventory:
+    """A synthetic AKiPS inventory of `devices` devices.
+
+    Devices are named bldgBBB-swNN-ROLE in buildings of 100, and building B
+    owns 10.{B // 256}.{B % 256}.0/24.  Edge switches have 48 ports, and MAC
+    address m (see mac()) sits on port m % 48 of the (m // 48)th edge switch.
+    Everything is derived from the device index, so 100k devices cost almost
+    no memory; replies are memoized since benchmarks repeat the same commands.
+    """
+
+    def __init__(self, devices=1000):
+        self.count = devices
+        self.now = int(time.time())
+        self.names = [self.name(i) for i in range(devices)]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.switches = [i for i in range(devices) if self.role(i) == "edge"]
+        self._replies = {}
+        self._lock = threading.Lock()
+
+    # -- Per-device data --
+
+    @staticmethod
+    def role(i):
+        return ROLES[i % 100 % len(ROLES)]
+
+    def name(self, i):
+        building, n = divmod(i, 100)
+        return f"bldg{building:03d}-sw{n:02d}-{self.role(i)}"
+
+    def ip(self, i):
+        building, n = divmod(i, 100)
+        return f"10.{building // 256}.{building % 256}.{n + 1}"
+
+    def enum(self, number, value, i, descr):
+        modified = self.now - mixed(i) % 10**6
+        return f"{number},{value},{modified - 10**6},{modified},{descr}"
+
+    def tables(self, i):
+        """(attribute names, {child: {attribute: value}}) groups for device i.
+
+        Grouped so a query can skip a whole group by attribute name before
+        building its values (a switch has 48 ports nobody asked for).
+        """
+        name = self.names[i]
+        building = i // 100
+        up = mixed(i) % 10 != 0
+        yield SYS_ATTRIBUTES, lambda: {
+            "sys": {
+                "ip4addr": self.ip(i),
+                "SNMPv2-MIB.sysName": f"{name}.net.example.edu",
+                "SNMPv2-MIB.sysDescr": "Cisco IOS Software, Catalyst L3 Switch, "
+                "Version 17.9.4",
+                "SNMPv2-MIB.sysObjectID": "CISCO-PRODUCTS-MIB.cat9300",
+                "SNMPv2-MIB.sysLocation": f"Building {building:03d}",
+                "SNMPv2-MIB.sysContact": "noc@example.edu",
+                "SNMP.snmpState": self.enum(2, "up", i + 1, "snmp")
+                if up
+                else self.enum(1, "down", i + 1, "snmp"),
+            }
+        }
+        yield PING_ATTRIBUTES, lambda: {
+            "ping4": {
+                "PING.icmpState": self.enum(2, "up", i, self.ip(i))
+                if up
+                else self.enum(1, "down", i, self.ip(i))
+            }
+        }
+        if self.role(i) != "ap":
+            yield LLDP_ATTRIBUTES, lambda: {
+                f"Gi1/1/{k}": {
+                    "LLDP-MIB.lldpRemSysName": self.names[(i + k) % self.count],
+                    "LLDP-MIB.lldpRemPortId": f"Gi1/1/{3 - k}",
+                }
+                for k in (1, 2)
+            }
+        if self.role(i) == "edge":
+            yield PORT_ATTRIBUTES, lambda: {
+                f"Gi1/0/{port}": self.port(i, port) for port in self.ports()
+            }
+
+    @staticmethod
+    def ports():
+        return range(1, PORTS_PER_SWITCH + 1)
+
+    def port(self, i, port):
+        key = i * PORTS_PER_SWITCH + port
+        up = mixed(key) % 4 != 0
+        return {
+            "IF-MIB.ifOperStatus": self.enum(1, "up", key, "")
+            if up
+            else self.enum(2, "down", key, ""),
+            "IF-MIB.ifAdminStatus": self.enum(1, "up", key + 1, ""),
+            "IF-MIB.ifAlias": f"desk {port:02d}",
+            "IF-MIB.ifHighSpeed": "1000",
+        }
+
+    def events(self, i):
+        """Port flap events for device i, as (epoch, child, attribute, details)."""
+        if self.role(i) != "edge":
+            return
+        for port in self.ports():
+            key = i * PORTS_PER_SWITCH + port
+            if mixed(key) % 5 == 0:
+                epoch = self.now - mixed(key) % (7 * 86400)
+                yield epoch, f"Gi1/0/{port}", "IF-MIB.ifOperStatus", "up,down"
+
+    # -- MAC addresses --
+
+    def mac(self, m):
+        """The m-th synthetic MAC address on an edge switch port."""
+        return "02:00:" + ":".join(f"{b:02x}" for b in m.to_bytes(4, "big"))
+
+    def macs(self, count):
+        return [self.mac(m) for m in range(count)]
+
+    def spm_entry(self, mac):
+        hex_chars = re.sub(r"[^0-9a-f]", "", mac.lower())
+        if len(hex_chars) != 12 or not hex_chars.startswith("0200"):
+            return None
+        m = int(hex_chars[4:], 16)
+        switch_slot, port = divmod(m, PORTS_PER_SWITCH)
+        if switch_slot >= len(self.switches):
+            return None
+        i = self.switches[switch_slot]
+        building = i // 100
+        return (
+            f"{self.mac(m)}\tExample Corp\t{self.names[i]}\tGi1/0/{port + 1}"
+            f"\t{100 + building % 50}\t10.200.{building % 256}.{port + 1}"
+        )
+
+    # -- Commands --
+
+    def reply(self, section, params):
+        """The text AKiPS would send for a request, memoized per request."""
+        key = (section, tuple(sorted(params.items())))
+        with self._lock:
+            if key in self._replies:
+                return self._replies[key]
+        if section == "api-db":
+            text = self.command(params.get("cmds", ""))
+        elif section == "api-spm":
+            entry = self.spm_entry(params.get("mac", ""))
+            text = f"{SPM_HEADER}\n{entry}\n" if entry else ""
+        else:
+            text = f"ERROR: {section} access is turned off"
+        with self._lock:
+            self._replies[key] = text
+        return text
+
+    def command(self, cmds):
+        tokens = cmds.split()
+        if tokens[:1] == ["mgroup"]:
+            return self.mgroup(tokens[2] if len(tokens) > 2 else "*")
+        if tokens[:2] == ["mget", "event"]:
+            # mget event {type} time {period} {parent} {child} {attribute}
+            return self.mget_event(*(tokens[5:8] + ["*"] * (8 - len(tokens))))
+        if tokens[:1] == ["mget"]:
+            # mget {type} {parent} {child} {attribute} [value {value}] ...
+            parent, child, attribute = (tokens[2:5] + ["*"] * 3)[:3]
+            value = None
+            if "value" in tokens[5:]:
+                value = tokens[tokens.index("value", 5) + 1]
+            return self.mget(parent, child, attribute, value)
+        return f"ERROR: api-db unknown command {tokens[:1]}"
+
+    def matching_devices(self, parent):
+        if parent == "*":
+            return range(self.count)
+        if not is_regex(parent):
+            i = self.index.get(parent)
+            return [] if i is None else [i]
+        match_parent = compile_filter(parent)
+        return [i for i, name in enumerate(self.names) if match_parent(name)]
+
+    def mget(self, parent, child, attribute, value=None):
+        match_child = compile_filter(child)
+        match_attribute = compile_filter(attribute)
+        match_value = compile_filter(value) if value else None
+        lines = []
+        for i in self.matching_devices(parent):
+            name = self.names[i]
+            for attribute_names, build in self.tables(i):
+                if match_attribute and not any(map(match_attribute, attribute_names)):
+                    continue
+                for child_name, attrs in build().items():
+                    if match_child and not match_child(child_name):
+                        continue
+                    for attr, val in attrs.items():
+                        if match_attribute and not match_attribute(attr):
+                            continue
+                        if match_value and not match_value(val):
+                            continue
+                        lines.append(f"{name} {child_name} {attr} = {val}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def mgroup(self, parent):
+        lines = []
+        for i in self.matching_devices(parent):
+            groups = [f"Building-{i // 100:03d}", self.role(i)]
+            if mixed(i) % 50 == 0:
+                groups.append("maintenance_mode")
+            lines.append(f"{self.names[i]} = {','.join(groups)}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def mget_event(self, parent, child, attribute):
+        match_child = compile_filter(child)
+        match_attribute = compile_filter(attribute)
+        lines = []
+        for i in self.matching_devices(parent):
+            for epoch, child_name, attr, details in self.events(i):
+                if match_child and not match_child(child_name):
+                    continue
+                if match_attribute and not match_attribute(attr):
+                    continue
+                lines.append(
+                    f"{epoch} {self.names[i]} {child_name} {attr} enum 0 {details}"
+                )
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+class FakeAkipsAdapter(BaseAdapter):
+    """requests transport answering AKiPS web API calls from an Inventory.
+
+    Each request sleeps `latency` seconds plus its reply size over `bandwidth`
+    bytes per second, standing in for the server and the network.  Requests
+    and bytes served are counted for reporting.
+    """
+
+    def __init__(self, inventory, latency=0.0, bandwidth=None):
+        super().__init__()
+        self.inventory = inventory
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.requests = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        url = urlsplit(request.url)
+        # Credentials travel in the POST body; the command is in the URL
+        params = dict(parse_qsl(url.query))
+        body = request.body or ""
+        if isinstance(body, bytes):
+            body = body.decode()
+        form = dict(parse_qsl(body))
+        if form.get("password") is None and params.get("password") is None:
+            text = "ERROR: api-db invalid username/password"
+        else:
+            text = self.inventory.reply(url.path.strip("/"), params)
+        content = text.encode()
+
+        delay = self.latency
+        if self.bandwidth:
+            delay += len(content) / self.bandwidth
+        if delay:
+            time.sleep(delay)
+        with self._lock:
+            self.requests += 1
+            self.bytes += len(content)
+
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict({"Content-Type": "text/plain"})
+        response.encoding = "utf-8"
+        response._content = content
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def fake_client(inventory, latency=0.0, bandwidth=None, server="akips.invalid"):
+    """An AKIPS client whose requests are answered by a FakeAkipsAdapter."""
+    api = AKIPS(server=server, password="fake")
+    adapter = FakeAkipsAdapter(inventory, latency=latency, bandwidth=bandwidth)
+    api.session.mount("https://", adapter)
+    return api, adapter
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run SNMPeek against a synthetic AKiPS inventory.",
+        usage="%(prog)s [options] -- SNMPEEK_ARGS...",
+    )
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument(
+        "--latency", type=float, default=0, help="Per-request latency in ms"
+    )
+    parser.add_argument(
+        "--bandwidth", type=float, default=None, help="Reply bandwidth in MB/s"
+    )
+    parser.add_argument(
+        "--show-macs",
+        type=int,
+        metavar="N",
+        help="Print N MAC addresses the inventory knows about and exit",
+    )
+    args, snmpeek_args = parser.parse_known_args()
+    if snmpeek_args[:1] == ["--"]:
+        snmpeek_args = snmpeek_args[1:]
+
+    inventory = Inventory(args.devices)
+    if args.show_macs:
+        print("\n".join(inventory.macs(args.show_macs)))
+        return
+
+    snmpeek = load_snmpeek()
+    api, adapter = fake_client(
+        inventory,
+        latency=args.latency / 1000,
+        bandwidth=args.bandwidth * 1e6 if args.bandwidth else None,
+    )
+    snmpeek.connect_akips = lambda args, profile=None: api
+    sys.argv = ["SNMPeek"] + snmpeek_args
+    try:
+        snmpeek.run()
+    finally:
+        print(
+            f"fake AKiPS: {adapter.requests} requests, "
+            f"{adapter.bytes / 1e6:.1f} MB served",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()